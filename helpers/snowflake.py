@@ -1,7 +1,14 @@
 import snowflake.connector
 import os
+import glob
+import shutil
+import tempfile
 import time
+import warnings
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 
 
 # Establish a connection to Snowflake
@@ -64,8 +71,140 @@ def fetch_results_from_query_id(conn, query_id):
     finally:
         cursor.close()
 
+LOCAL_STAGE_PREFIX = 'file://'
+
+# The stage must be an internal stage (named, @~ or @%table): GET cannot download
+# from external S3/GCS/Azure stages, so unloading there would leave files stranded.
+def stage_location(stage, query_id, prefix='unload'):
+    # Each query unloads to its own folder so concurrent runs never share files.
+    # A stage given as file://<dir> is a local stand-in and never touches Snowflake.
+    if stage.startswith(LOCAL_STAGE_PREFIX):
+        return LOCAL_STAGE_PREFIX + os.path.join(stage[len(LOCAL_STAGE_PREFIX):], prefix, query_id)
+    if '://' in stage:
+        raise ValueError(f"Unload stage must be an internal Snowflake stage, not a URL: {stage}")
+    stage = stage if stage.startswith('@') else f"@{stage}"
+    return f"{stage.rstrip('/')}/{prefix}/{query_id}/"
+
+def is_local_location(location):
+    return location.startswith(LOCAL_STAGE_PREFIX)
+
+# Unload a finished query's result set to a stage as partitioned Parquet files
+def unload_results_to_stage(conn, query_id, location, max_file_size=268435456):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"use warehouse cruncher")
+        cursor.execute(f"""
+            copy into {location}
+            from (select * from table(result_scan('{query_id}')))
+            file_format = (type = parquet compression = snappy)
+            header = true
+            overwrite = true
+            max_file_size = {max_file_size}
+        """)
+        # A single summary row: (rows_unloaded, input_bytes, output_bytes)
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+def _copy_local_file(path, source_dir, local_dir):
+    # Keep the path relative to the stand-in so same-named files in subfolders don't collide
+    target = os.path.join(local_dir, os.path.relpath(path, source_dir))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(path, target)
+    return target
+
+# Download the unloaded files; a file:// directory can stand in for the stage
+def download_stage_files(conn, location, local_dir, parallel=8):
+    os.makedirs(local_dir, exist_ok=True)
+    if is_local_location(location):
+        source_dir = location[len(LOCAL_STAGE_PREFIX):]
+        if not os.path.isdir(source_dir):
+            raise FileNotFoundError(f"Local stage directory not found: {source_dir}")
+        paths = sorted(glob.glob(os.path.join(source_dir, '**', '*.parquet'), recursive=True))
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            return list(executor.map(lambda path: _copy_local_file(path, source_dir, local_dir), paths))
+
+    cursor = conn.cursor()
+    try:
+        # GET splits the transfer across `parallel` threads on the connector side
+        cursor.execute(f"get {location} 'file://{os.path.abspath(local_dir)}' parallel = {parallel}")
+        # One row per file: (file, size, status, message)
+        paths = []
+        for file_name, _, status, message in cursor.fetchall():
+            if status != 'DOWNLOADED':
+                raise ValueError(f"Failed to download {file_name} from {location}: {status} {message}")
+            paths.append(os.path.join(local_dir, file_name.split('/')[-1]))
+        return sorted(paths)
+    finally:
+        cursor.close()
+
+# Read the downloaded Parquet files in parallel and stitch them into one table
+def read_parquet_files(paths, max_workers=8):
+    if not paths:
+        return None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tables = list(executor.map(pq.read_table, sorted(paths)))
+    tables = [table for table in tables if table.num_rows > 0]
+    if not tables:
+        return None
+    return pa.concat_tables(tables, promote_options='default')
+
+def remove_stage_files(conn, location):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"remove {location}")
+    finally:
+        cursor.close()
+
+# Snowflake unloads NUMBER columns as Parquet DECIMAL. Integer ones (scale 0) are cast
+# back to int64 to match what fetchall() returns; NUMBER(p, s > 0) stays Decimal there too.
+def normalize_number_columns(table):
+    fields = []
+    for field in table.schema:
+        if pa.types.is_decimal(field.type) and field.type.scale == 0 and field.type.precision <= 18:
+            field = field.with_type(pa.int64())
+        fields.append(field)
+    return table.cast(pa.schema(fields))
+
+# Same [header] + rows shape as fetch_results_from_query_id. This materializes every cell
+# as a Python object; use fetch_dataframe_via_stage when a DataFrame is what's needed.
+def table_to_rows(table):
+    if table is None:
+        return None
+    table = normalize_number_columns(table)
+    columns = [column.to_pylist() for column in table.columns]
+    return [table.column_names] + list(zip(*columns))
+
+# Bulk alternative to fetch_results_from_query_id for large result sets.
+# Errors propagate so a failed unload can't be mistaken for an empty result.
+def fetch_results_via_stage(conn, query_id, stage, local_dir=None, parallel=8, cleanup=True):
+    location = stage_location(stage, query_id)
+    download_dir = local_dir or tempfile.mkdtemp(prefix=f"unload_{query_id}_")
+    try:
+        if not is_local_location(location):
+            unload_results_to_stage(conn, query_id, location)
+        paths = download_stage_files(conn, location, download_dir, parallel=parallel)
+        return read_parquet_files(paths, max_workers=parallel)
+    finally:
+        if cleanup:
+            if not is_local_location(location):
+                try:
+                    remove_stage_files(conn, location)
+                except Exception as e:
+                    # Non-fatal, but the unloaded files are left behind and need removing by hand
+                    warnings.warn(f"Could not remove unloaded files at {location}: {e}")
+            if local_dir is None:
+                shutil.rmtree(download_dir, ignore_errors=True)
+
+# Arrow-to-pandas path that skips per-cell Python objects
+def fetch_dataframe_via_stage(conn, query_id, stage, local_dir=None, parallel=8, cleanup=True):
+    table = fetch_results_via_stage(conn, query_id, stage, local_dir=local_dir, parallel=parallel, cleanup=cleanup)
+    if table is None:
+        return None
+    return normalize_number_columns(table).to_pandas()
+
 # Submit a query to Snowflake and fetch results
-def query_snowflake(query, user, password, account, wh, database, schema, delay=15, warehouse='snowflake_warehouse_lg', execute_async=True):
+def query_snowflake(query, user, password, account, wh, database, schema, delay=15, warehouse='snowflake_warehouse_lg', execute_async=True, unload_stage=None):
     # print('Connecting to Snowflake...')
     conn = create_connection(user, password, account, wh, database, schema)
     # print('A connection to Snowflake has been created!')
@@ -88,7 +227,11 @@ def query_snowflake(query, user, password, account, wh, database, schema, delay=
         query_info = check_query_status(conn, query_id)
         status = query_info["status"]
         if status == "SUCCESS":
-            results = fetch_results_from_query_id(conn, query_id)  
+            if unload_stage:
+                # Large result sets: unload through an internal stage, same [header] + rows shape
+                results = table_to_rows(fetch_results_via_stage(conn, query_id, unload_stage))
+            else:
+                results = fetch_results_from_query_id(conn, query_id)
             # print("Query Completed!")
             break
         elif status in ["FAILED_WITH_ERROR", "ABORTED"]:
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+
+
+EARTH_RADIUS_M = 6371008.8
+
+COLUMNS = ['ID', 'POINT_TYPE', 'ENTRY_DATETIME', 'EXIT_DATETIME', 'MAIN_LATITUDE', 'MAIN_LONGITUDE', 'POINT_COUNT']
+
+# Cap on anchors x look-ahead pings evaluated at once while searching for stay ends
+MAX_BATCH_CELLS = 4_000_000
+
+
+# Haversine distance in meters, broadcasting over arrays
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1 = np.radians(lat1)
+    lat2 = np.radians(lat2)
+    dlat = lat2 - lat1
+    dlon = np.radians(lon2) - np.radians(lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+# Concatenated np.arange(start, start + length) for every start/length pair
+def _ranges(starts, lengths):
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + np.arange(lengths.sum()) - offsets
+
+# For every ping, the index of the first later ping of the same device farther than the
+# radius from it (or the device's end), searched for all pings at once within the next
+# `window` pings. Pings whose stay reaches past the window are left at -1.
+def stay_ends(latitudes, longitudes, device_end, radius_m, window=32):
+    n = len(latitudes)
+    positions = np.arange(n)
+    ends = np.full(n, -1)
+    batch_size = max(1, MAX_BATCH_CELLS // window)
+    for start in range(0, n, batch_size):
+        batch = positions[start:start + batch_size]
+        candidates = batch[:, None] + np.arange(1, window + 1)
+        past_end = candidates >= device_end[batch, None]
+        candidates = np.minimum(candidates, device_end[batch, None] - 1)
+        beyond = past_end | (haversine_m(
+            latitudes[batch, None], longitudes[batch, None], latitudes[candidates], longitudes[candidates]
+        ) > radius_m)
+        hit = beyond.any(axis=1)
+        first = batch + 1 + beyond.argmax(axis=1)
+        ends[batch[hit]] = np.minimum(first[hit], device_end[batch[hit]])
+    return ends
+
+# Exact stay end for a single anchor, scanning ahead in doubling windows
+def _stay_end(latitudes, longitudes, anchor, device_end, radius_m, window=64):
+    start = anchor + 1
+    while start < device_end:
+        stop = min(device_end, start + window)
+        distances = haversine_m(latitudes[anchor], longitudes[anchor], latitudes[start:stop], longitudes[start:stop])
+        beyond = np.flatnonzero(distances > radius_m)
+        if beyond.size:
+            return start + int(beyond[0])
+        start = stop
+        window *= 2
+    return device_end
+
+# Anchor-based stay point detection: every ping of a stay is within the radius of its
+# first ping. Returns the stay mask and, for stay pings, the index of their anchor.
+def detect_stays(latitudes, longitudes, minutes, device_end, stay_radius_m, min_stay_minutes):
+    n = len(latitudes)
+    positions = np.arange(n)
+    ends = stay_ends(latitudes, longitudes, device_end, stay_radius_m)
+    resolved = ends >= 0
+    qualifies = resolved & (ends - 1 > positions) & (minutes[np.maximum(ends, 1) - 1] - minutes >= min_stay_minutes)
+    candidates = np.flatnonzero(qualifies | ~resolved)
+
+    # Pings that don't start a stay just advance the scan, so the next anchor is always
+    # the next candidate at or after the previous stay's end. Only anchors the scan
+    # actually reaches get their long stays measured exactly.
+    anchors = []
+    anchor_ends = []
+    index = 0
+    while index < candidates.size:
+        anchor = candidates[index]
+        end = ends[anchor]
+        if end < 0:
+            end = _stay_end(latitudes, longitudes, anchor, device_end[anchor], stay_radius_m)
+            if minutes[end - 1] - minutes[anchor] < min_stay_minutes:
+                index += 1
+                continue
+        anchors.append(anchor)
+        anchor_ends.append(end)
+        index = np.searchsorted(candidates, end)
+    anchors = np.asarray(anchors, dtype=int)
+    lengths = np.asarray(anchor_ends, dtype=int) - anchors
+
+    is_stay = np.zeros(n, dtype=bool)
+    run_start = positions.copy()
+    members = _ranges(anchors, lengths)
+    is_stay[members] = True
+    run_start[members] = np.repeat(anchors, lengths)
+    return is_stay, run_start
+
+# Equirectangular projection to meters around a per-ping reference latitude
+def project_to_meters(latitudes, longitudes, reference_latitudes):
+    x = np.radians(longitudes) * np.cos(np.radians(reference_latitudes)) * EARTH_RADIUS_M
+    y = np.radians(latitudes) * EARTH_RADIUS_M
+    return x, y
+
+# Douglas-Peucker over many polylines at once, given as inclusive [start, end] index
+# pairs into x/y. Each round splits every still-active segment at its farthest point.
+def douglas_peucker(x, y, starts, ends, tolerance_m):
+    keep = np.zeros(len(x), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+    active = ends - starts >= 2
+    starts, ends = starts[active], ends[active]
+    while starts.size:
+        lengths = ends - starts - 1
+        interior = _ranges(starts + 1, lengths)
+        segment = np.repeat(np.arange(starts.size), lengths)
+        dx = (x[ends] - x[starts])[segment]
+        dy = (y[ends] - y[starts])[segment]
+        px = x[interior] - x[starts][segment]
+        py = y[interior] - y[starts][segment]
+        norm = np.hypot(dx, dy)
+        distances = np.where(
+            norm > 0,
+            np.abs(dx * py - dy * px) / np.where(norm > 0, norm, 1),
+            np.hypot(px, py),
+        )
+
+        # Farthest interior point per segment (first one on ties)
+        order = np.lexsort((-distances, segment))
+        first = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        farthest = order[first]
+        split = interior[farthest]
+        splits = distances[farthest] > tolerance_m
+        keep[split[splits]] = True
+
+        starts, split, ends = starts[splits], split[splits], ends[splits]
+        starts, ends = np.concatenate([starts, split]), np.concatenate([split, ends])
+        active = ends - starts >= 2
+        starts, ends = starts[active], ends[active]
+    return keep
+
+# Collapse stay points and simplify movement for each device's cleaned trajectory.
+# Pings without coordinates are dropped before compressing.
+def compress_trajectories(df, tolerance_m=25, stay_radius_m=50, min_stay_minutes=10):
+    df = df.dropna(subset=['MAIN_LATITUDE', 'MAIN_LONGITUDE'])
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS), 1.0
+
+    df = df.assign(
+        DATETIME=pd.to_datetime(df['DATETIME']),
+        MAIN_LATITUDE=df['MAIN_LATITUDE'].astype(float),
+        MAIN_LONGITUDE=df['MAIN_LONGITUDE'].astype(float),
+    ).sort_values(['ID', 'DATETIME'], kind='stable').reset_index(drop=True)
+
+    latitudes = df['MAIN_LATITUDE'].to_numpy()
+    longitudes = df['MAIN_LONGITUDE'].to_numpy()
+    minutes = (df['DATETIME'] - df['DATETIME'].min()).dt.total_seconds().to_numpy() / 60
+    positions = np.arange(len(df))
+    device = df.groupby('ID', sort=False).ngroup().to_numpy()
+    new_device = np.concatenate([[True], device[1:] != device[:-1]])
+    device_end = np.append(np.flatnonzero(new_device)[1:], len(df))[np.cumsum(new_device) - 1]
+
+    is_stay, run_start = detect_stays(latitudes, longitudes, minutes, device_end, stay_radius_m, min_stay_minutes)
+
+    # Movement blocks are maximal runs of non-stay pings within one device
+    block_start = ~is_stay & (new_device | np.concatenate([[True], is_stay[:-1]]))
+    block_end = ~is_stay & (np.append(new_device[1:], True) | np.append(is_stay[1:], True))
+    reference = df.groupby('ID', sort=False)['MAIN_LATITUDE'].transform('mean').to_numpy()
+    x, y = project_to_meters(latitudes, longitudes, reference)
+    kept = douglas_peucker(x, y, np.flatnonzero(block_start), np.flatnonzero(block_end), tolerance_m)
+
+    # Every ping is represented by its stay's anchor or by the last kept movement point
+    last_kept = np.maximum.accumulate(np.where(kept, positions, -1))
+    representative = np.where(is_stay, run_start, last_kept)
+
+    compressed = df.assign(REPRESENTATIVE=representative, IS_STAY=is_stay).groupby(
+        ['ID', 'REPRESENTATIVE'], sort=False
+    ).agg(
+        ENTRY_DATETIME=('DATETIME', 'first'),
+        EXIT_DATETIME=('DATETIME', 'last'),
+        POINT_COUNT=('DATETIME', 'size'),
+        IS_STAY=('IS_STAY', 'first'),
+        FIRST_LATITUDE=('MAIN_LATITUDE', 'first'),
+        FIRST_LONGITUDE=('MAIN_LONGITUDE', 'first'),
+        MEAN_LATITUDE=('MAIN_LATITUDE', 'mean'),
+        MEAN_LONGITUDE=('MAIN_LONGITUDE', 'mean'),
+    ).reset_index()
+
+    # Stays sit at their centroid, movement points keep their original coordinates
+    compressed['MAIN_LATITUDE'] = np.where(compressed['IS_STAY'], compressed['MEAN_LATITUDE'], compressed['FIRST_LATITUDE'])
+    compressed['MAIN_LONGITUDE'] = np.where(compressed['IS_STAY'], compressed['MEAN_LONGITUDE'], compressed['FIRST_LONGITUDE'])
+    compressed['POINT_TYPE'] = np.where(compressed['IS_STAY'], 'stay', 'move')
+    compression_ratio = len(df) / len(compressed)
+    return compressed[COLUMNS], compression_ratio
@@ -1,6 +1,7 @@
 import streamlit as st
 import re
 from helpers.snowflake import query_snowflake
+from helpers.trajectory import compress_trajectories
 import pandas as pd
 
 
@@ -39,6 +40,11 @@ if password == st.secrets["password"]:
     # Toggle for hashed device ID
     is_hashed = st.checkbox("hashed id?")
 
+    # Export mode: every surviving ping, or stays collapsed and movement simplified
+    export_mode = st.radio("export", ["full", "compressed"], horizontal=True)
+    if export_mode == "compressed":
+        tolerance_m = st.number_input("tolerance (m)", min_value=1, value=25)
+
     # Clean button
     if st.button("clean"):
         with st.spinner('cleaning data...'):
@@ -299,7 +305,12 @@ if password == st.secrets["password"]:
         filtered_df = results_df[condition]
         filtered_df['PREV_LATITUDE'] = filtered_df['MAIN_LATITUDE'].shift(1)
         filtered_df['PREV_LONGITUDE'] = filtered_df['MAIN_LONGITUDE'].shift(1)
-        results_csv = filtered_df.to_csv(index=False).encode('utf-8')
+        if export_mode == "compressed":
+            compressed_df, compression_ratio = compress_trajectories(filtered_df, tolerance_m=tolerance_m)
+            st.write(f"compressed {len(filtered_df)} pings to {len(compressed_df)} points ({compression_ratio:.1f}x)")
+            results_csv = compressed_df.to_csv(index=False).encode('utf-8')
+        else:
+            results_csv = filtered_df.to_csv(index=False).encode('utf-8')
         st.download_button(
             label="clean data",
             data=results_csv,
@@ -0,0 +1,230 @@
+import decimal
+import os
+import re
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("snowflake.connector")
+pytest.importorskip("streamlit")
+
+from helpers.snowflake import (
+    download_stage_files,
+    fetch_dataframe_via_stage,
+    fetch_results_via_stage,
+    read_parquet_files,
+    stage_location,
+    table_to_rows,
+    unload_results_to_stage,
+)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+
+    def execute(self, sql, **kwargs):
+        sql = ' '.join(sql.split())
+        self.connection.statements.append(sql)
+        for prefix, handler in self.connection.handlers.items():
+            if sql.lower().startswith(prefix):
+                self.result = handler(sql)
+                return
+        self.result = []
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+# Records every statement and answers with canned rows per statement prefix
+class FakeConnection:
+    def __init__(self, handlers=None):
+        self.statements = []
+        self.handlers = handlers or {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def fake_get(files, status='DOWNLOADED'):
+    # Writes the "downloaded" files into the GET target like the connector would
+    def handler(sql):
+        target = re.search(r"'file://([^']+)'", sql).group(1)
+        rows = []
+        for name, values in files.items():
+            write_parquet(os.path.join(target, name), values)
+            rows.append((name, 100, status, '' if status == 'DOWNLOADED' else 'access denied'))
+        return rows
+    return handler
+
+
+def failing(message):
+    def handler(sql):
+        raise RuntimeError(message)
+    return handler
+
+
+def write_parquet(path, values):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.table({"A": values}), path)
+
+
+def test_stage_location_only_uses_local_mode_for_file_prefix(tmp_path):
+    assert stage_location("my_stage", "q1") == "@my_stage/unload/q1/"
+    assert stage_location("@my_stage/", "q1") == "@my_stage/unload/q1/"
+    assert stage_location(f"file://{tmp_path}", "q1") == f"file://{tmp_path}/unload/q1"
+    # A local directory that shares the stage's name doesn't switch to local mode
+    assert stage_location(str(tmp_path), "q1") == f"@{tmp_path}/unload/q1/"
+
+
+def test_stage_location_rejects_external_urls():
+    with pytest.raises(ValueError):
+        stage_location("s3://bucket/path", "q1")
+
+
+def test_download_keeps_same_named_files_in_subfolders(tmp_path):
+    stage = tmp_path / "stage"
+    location = stage_location(f"file://{stage}", "q1")
+    write_parquet(str(stage / "unload" / "q1" / "data_0.parquet"), [1, 2])
+    write_parquet(str(stage / "unload" / "q1" / "sub" / "data_0.parquet"), [3])
+
+    paths = download_stage_files(None, location, str(tmp_path / "download"))
+
+    assert len(paths) == 2
+    assert len(set(paths)) == 2
+    assert all(os.path.exists(path) for path in paths)
+    table = read_parquet_files(paths)
+    assert sorted(table.column("A").to_pylist()) == [1, 2, 3]
+
+
+def test_read_parquet_files_returns_none_for_no_rows(tmp_path):
+    assert read_parquet_files([]) is None
+    path = str(tmp_path / "empty.parquet")
+    pq.write_table(pa.table({"A": pa.array([], type=pa.int64())}), path)
+    assert read_parquet_files([path]) is None
+
+
+def test_fetch_results_via_local_stage(tmp_path):
+    stage = tmp_path / "stage"
+    for i in range(3):
+        write_parquet(str(stage / "unload" / "q1" / f"data_0_0_{i}.snappy.parquet"), [i, i + 10])
+
+    table = fetch_results_via_stage(None, "q1", f"file://{stage}")
+
+    assert table.num_rows == 6
+    assert sorted(table.column("A").to_pylist()) == [0, 1, 2, 10, 11, 12]
+    # The stand-in stage is left untouched
+    assert len(os.listdir(stage / "unload" / "q1")) == 3
+
+
+def test_fetch_results_via_missing_local_stage_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        fetch_results_via_stage(None, "q2", f"file://{tmp_path}")
+
+
+def test_table_to_rows_matches_result_scan_shape():
+    table = pa.table({"ID": ["a", "b"], "A": [1, 2]})
+    assert table_to_rows(table) == [["ID", "A"], ("a", 1), ("b", 2)]
+    assert table_to_rows(None) is None
+
+
+def test_unload_statement_and_summary_row():
+    conn = FakeConnection({'copy into': lambda sql: [(6, 1000, 400)]})
+
+    assert unload_results_to_stage(conn, 'q1', '@stg/unload/q1/', max_file_size=1024) == 6
+
+    copy = conn.statements[-1]
+    assert copy.startswith('copy into @stg/unload/q1/ ')
+    assert "from (select * from table(result_scan('q1')))" in copy
+    assert 'file_format = (type = parquet compression = snappy)' in copy
+    assert 'header = true' in copy
+    assert 'max_file_size = 1024' in copy
+
+
+def test_get_statement_and_result_rows(tmp_path):
+    conn = FakeConnection({'get': fake_get({'data_0_0_1.snappy.parquet': [2], 'data_0_0_0.snappy.parquet': [1]})})
+
+    paths = download_stage_files(conn, '@stg/unload/q1/', str(tmp_path), parallel=4)
+
+    assert conn.statements == [f"get @stg/unload/q1/ 'file://{tmp_path}' parallel = 4"]
+    assert paths == [
+        str(tmp_path / 'data_0_0_0.snappy.parquet'),
+        str(tmp_path / 'data_0_0_1.snappy.parquet'),
+    ]
+
+
+def test_get_raises_on_failed_file(tmp_path):
+    conn = FakeConnection({'get': fake_get({'data_0_0_0.snappy.parquet': [1]}, status='ERROR')})
+
+    with pytest.raises(ValueError, match='data_0_0_0.snappy.parquet'):
+        download_stage_files(conn, '@stg/unload/q1/', str(tmp_path))
+
+
+def test_fetch_results_via_stage_unloads_downloads_and_removes():
+    conn = FakeConnection({
+        'copy into': lambda sql: [(3, 100, 50)],
+        'get': fake_get({'data_0_0_0.snappy.parquet': [1, 2], 'data_0_0_1.snappy.parquet': [3]}),
+    })
+
+    table = fetch_results_via_stage(conn, 'q1', 'stg')
+
+    assert table.column('A').to_pylist() == [1, 2, 3]
+    assert [statement.split()[0] for statement in conn.statements] == ['use', 'copy', 'get', 'remove']
+    assert conn.statements[-1] == 'remove @stg/unload/q1/'
+
+
+def test_fetch_results_via_stage_removes_files_when_download_fails():
+    conn = FakeConnection({'copy into': lambda sql: [(3, 100, 50)], 'get': failing('GET failed')})
+
+    with pytest.raises(RuntimeError, match='GET failed'):
+        fetch_results_via_stage(conn, 'q1', 'stg')
+
+    assert conn.statements[-1] == 'remove @stg/unload/q1/'
+
+
+def test_failed_remove_warns_with_location():
+    conn = FakeConnection({
+        'copy into': lambda sql: [(1, 100, 50)],
+        'get': fake_get({'data_0_0_0.snappy.parquet': [1]}),
+        'remove': failing('insufficient privileges'),
+    })
+
+    with pytest.warns(UserWarning, match='@stg/unload/q1/'):
+        table = fetch_results_via_stage(conn, 'q1', 'stg')
+
+    assert table.num_rows == 1
+
+
+def test_number_columns_match_fetchall_types():
+    # NUMBER(38, 0) comes back as int like fetchall(); NUMBER(10, 2) stays Decimal as it does there
+    table = pa.table({
+        'COUNT': pa.array([decimal.Decimal(1), decimal.Decimal(2)], type=pa.decimal128(18, 0)),
+        'AMOUNT': pa.array([decimal.Decimal('1.50'), None], type=pa.decimal128(10, 2)),
+    })
+
+    rows = table_to_rows(table)
+
+    assert rows == [['COUNT', 'AMOUNT'], (1, decimal.Decimal('1.50')), (2, None)]
+    assert type(rows[1][0]) is int
+
+
+def test_fetch_dataframe_via_local_stage(tmp_path):
+    stage = tmp_path / "stage"
+    os.makedirs(stage / "unload" / "q1")
+    pq.write_table(
+        pa.table({'ID': ['a', 'b'], 'COUNT': pa.array([decimal.Decimal(1), decimal.Decimal(2)], type=pa.decimal128(18, 0))}),
+        str(stage / "unload" / "q1" / "data_0_0_0.snappy.parquet"),
+    )
+
+    df = fetch_dataframe_via_stage(None, 'q1', f"file://{stage}")
+
+    assert list(df.columns) == ['ID', 'COUNT']
+    assert df['COUNT'].dtype == 'int64'
+    assert df['COUNT'].tolist() == [1, 2]
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.trajectory import compress_trajectories
+
+# Roughly one meter of latitude in degrees
+METER = 1 / 111195
+
+
+def pings(device_id, start, latitudes, longitudes):
+    return pd.DataFrame({
+        'ID': device_id,
+        'DATETIME': pd.date_range(start, periods=len(latitudes), freq='min'),
+        'MAIN_LATITUDE': latitudes,
+        'MAIN_LONGITUDE': longitudes,
+    })
+
+
+def test_stationary_dwell_collapses_to_one_stay():
+    rng = np.random.default_rng(0)
+    df = pings('a', '2024-01-01', 40 + rng.normal(0, 5 * METER, 120), np.full(120, -74.0))
+
+    compressed, ratio = compress_trajectories(df)
+
+    assert len(compressed) == 1
+    stay = compressed.iloc[0]
+    assert stay['POINT_TYPE'] == 'stay'
+    assert stay['POINT_COUNT'] == 120
+    assert stay['ENTRY_DATETIME'] == pd.Timestamp('2024-01-01 00:00')
+    assert stay['EXIT_DATETIME'] == pd.Timestamp('2024-01-01 01:59')
+    assert stay['MAIN_LATITUDE'] == pytest.approx(df['MAIN_LATITUDE'].mean())
+    assert ratio == 120.0
+
+
+def test_slow_walker_is_not_a_stay_but_dwell_is():
+    walk = 40 + np.arange(60) * 40 * METER
+    dwell = np.full(30, walk[-1] + 2000 * METER)
+    df = pings('a', '2024-01-01', np.concatenate([walk, dwell]), np.full(90, -74.0))
+
+    compressed, _ = compress_trajectories(df)
+
+    moves = compressed[compressed['POINT_TYPE'] == 'move']
+    stays = compressed[compressed['POINT_TYPE'] == 'stay']
+    assert moves['POINT_COUNT'].sum() == 60
+    assert moves['ENTRY_DATETIME'].min() == pd.Timestamp('2024-01-01 00:00')
+    assert moves['MAIN_LATITUDE'].max() - moves['MAIN_LATITUDE'].min() == pytest.approx(59 * 40 * METER)
+    assert len(stays) == 1
+    assert stays.iloc[0]['POINT_COUNT'] == 30
+    assert stays.iloc[0]['ENTRY_DATETIME'] == pd.Timestamp('2024-01-01 01:00')
+
+
+def test_straight_line_is_simplified_to_its_endpoints():
+    df = pings('a', '2024-01-01', 40 + np.arange(30) * 200 * METER, np.full(30, -74.0))
+
+    compressed, ratio = compress_trajectories(df, tolerance_m=10)
+
+    assert list(compressed['POINT_TYPE']) == ['move', 'move']
+    assert list(compressed['POINT_COUNT']) == [29, 1]
+    assert list(compressed['ENTRY_DATETIME']) == [pd.Timestamp('2024-01-01 00:00'), pd.Timestamp('2024-01-01 00:29')]
+    assert list(compressed['EXIT_DATETIME']) == [pd.Timestamp('2024-01-01 00:28'), pd.Timestamp('2024-01-01 00:29')]
+    assert ratio == 15.0
+
+
+def test_corner_is_kept_by_douglas_peucker():
+    latitudes = np.concatenate([40 + np.arange(20) * 200 * METER, np.full(20, 40 + 19 * 200 * METER)])
+    longitudes = np.concatenate([np.full(20, -74.0), -74.0 + np.arange(1, 21) * 200 * METER * 1.3])
+    df = pings('a', '2024-01-01', latitudes, longitudes)
+
+    compressed, _ = compress_trajectories(df, tolerance_m=10)
+
+    assert len(compressed) == 3
+    assert compressed.iloc[1]['ENTRY_DATETIME'] == pd.Timestamp('2024-01-01 00:19')
+
+
+def test_point_counts_cover_every_ping_per_device():
+    rng = np.random.default_rng(1)
+    df = pd.concat([
+        pings(device_id, '2024-01-01', 40 + np.cumsum(rng.normal(0, 30 * METER, 200)), np.full(200, -74.0))
+        for device_id in ['a', 'b', 'c']
+    ])
+
+    compressed, ratio = compress_trajectories(df)
+
+    counts = compressed.groupby('ID')['POINT_COUNT'].sum()
+    assert counts.to_dict() == {'a': 200, 'b': 200, 'c': 200}
+    assert (compressed['EXIT_DATETIME'] >= compressed['ENTRY_DATETIME']).all()
+    assert ratio == pytest.approx(600 / len(compressed))
+
+
+def test_empty_input():
+    compressed, ratio = compress_trajectories(pd.DataFrame(columns=['ID', 'DATETIME', 'MAIN_LATITUDE', 'MAIN_LONGITUDE']))
+    assert compressed.empty
+    assert ratio == 1.0
+
+
+def test_pings_without_coordinates_are_dropped():
+    latitudes = np.full(30, 40.0)
+    latitudes[[5, 12]] = np.nan
+    longitudes = np.full(30, -74.0)
+    longitudes[20] = np.nan
+    far = pings('a', '2024-01-01 00:30', [41.0], [-74.0])
+    df = pd.concat([pings('a', '2024-01-01', latitudes, longitudes), far])
+
+    compressed, ratio = compress_trajectories(df)
+
+    assert compressed['POINT_COUNT'].sum() == 28
+    stay = compressed.iloc[0]
+    assert stay['POINT_TYPE'] == 'stay'
+    assert stay['POINT_COUNT'] == 27
+    assert stay['MAIN_LATITUDE'] == 40.0
+    assert stay['MAIN_LONGITUDE'] == -74.0
+    assert compressed['MAIN_LATITUDE'].notna().all()
+    assert ratio == 14.0
+
+
+def test_stays_do_not_cross_devices():
+    a = pings('a', '2024-01-01', np.full(5, 40.0), np.full(5, -74.0))
+    b = pings('b', '2024-01-01 00:05', np.full(20, 40.0), np.full(20, -74.0))
+
+    compressed, _ = compress_trajectories(pd.concat([a, b]))
+
+    assert list(compressed['ID']) == ['a', 'a', 'b']
+    assert list(compressed['POINT_TYPE']) == ['move', 'move', 'stay']
+    assert list(compressed['POINT_COUNT']) == [4, 1, 20]